@@ -1,11 +1,93 @@
-import json
+import asyncio
+import inspect
 import os
-from typing import List, Dict, Optional
+from contextlib import AsyncExitStack
+from functools import lru_cache
+from typing import AsyncIterator, Iterator, List, Dict, Optional
 
+import aioboto3
 import boto3
+import orjson
+from aiobotocore.config import AioConfig
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, ClientError
 
 from .config import AppConfig, load_config
+from .errors import BedrockError
+
+
+# Models that accept performanceConfigLatency="optimized"; others reject the parameter
+_LATENCY_OPTIMIZED_MODELS = (
+    "anthropic.claude-3-5-haiku",
+    "meta.llama3-1-70b",
+    "meta.llama3-1-405b",
+    "amazon.nova-pro",
+)
+
+
+# Models that support Anthropic prompt caching (cache_control blocks) on Bedrock.
+# A checkpoint only takes effect above a minimum prefix length: 1024 tokens for
+# these models, 2048 for Claude 3.5 Haiku. The default augmented system prompt
+# is ~1.2-1.4k tokens, so Claude 3.5 Haiku is deliberately left out (the marker
+# would be ignored). A shorter custom MEDAI_SYSTEM_PROMPT may not be cached at all.
+_PROMPT_CACHING_MODELS = (
+    "anthropic.claude-3-7-sonnet",
+    "anthropic.claude-sonnet-4",
+    "anthropic.claude-opus-4",
+)
+
+
+# Connection pool / retry settings shared by the sync and async clients
+_CLIENT_CONFIG = {
+    "max_pool_connections": 50,
+    "retries": {"max_attempts": 2, "mode": "standard"},
+    "tcp_keepalive": True,
+}
+
+# aiohttp closes idle pooled connections after keepalive_timeout (aiobotocore
+# defaults to 12s). Keep them for up to a minute; the AWS endpoint may still
+# drop an idle connection earlier, so pooling (and the startup warm-up) only
+# saves the TLS handshake for requests within that idle window.
+_ASYNC_KEEPALIVE_TIMEOUT = 60
+
+
+# Formatting instructions appended to every system prompt (unless already present)
+_SYSTEM_PROMPT_EXTRAS = (
+    "utiliser des emojis pertinents par section",
+    "séparer chaque section par une ligne horizontale '---' pour améliorer la lisibilité",
+    # Ultra‑short mode: cap length and structure
+    "mode synthèse stricte: 4–6 sections maximum, uniquement celles pertinentes au cas; pas besoin de toutes les sections du schéma",
+    "chaque section: 2–3 puces courtes (≤ 10 mots par puce)",
+    "longueur totale ≤ 200–250 mots (sauf si l'utilisateur demande explicitement des détails)",
+    "ne pas inclure de sous‑sections longues, ni tableaux, ni procédures détaillées; garder seulement critères, options, et recommandation",
+)
+
+
+@lru_cache(maxsize=8)
+def _augment_system_prompt(system_prompt: str) -> str:
+    """Append the formatting extras once per distinct system prompt."""
+    sp = system_prompt
+    low = sp.lower()
+    for extra in _SYSTEM_PROMPT_EXTRAS:
+        if extra.lower() not in low:
+            sp = f"{sp.rstrip()}\n{extra}"
+            low += "\n" + extra.lower()
+    return sp
+
+
+@lru_cache(maxsize=8)
+def _cached_system_blocks(system_prompt: str) -> List[Dict[str, object]]:
+    """System prompt as a content block marked for Bedrock prompt caching."""
+    return [{
+        "type": "text",
+        "text": _augment_system_prompt(system_prompt),
+        "cache_control": {"type": "ephemeral"},
+    }]
+
+
+def _single_user_message(text: str) -> List[Dict[str, object]]:
+    """Anthropic messages for a single user turn (fast path for ask())."""
+    return [{"role": "user", "content": [{"type": "text", "text": text}]}]
 
 
 class BedrockChat:
@@ -19,6 +101,8 @@ class BedrockChat:
         "anthropic.claude-3-sonnet-20240229-v1:0"
     - BEDROCK_INFERENCE_PROFILE_ARN: if set, invoke via this profile by
       providing it as the modelId (current boto3 accepts only modelId)
+    - BEDROCK_LATENCY_OPTIMIZED: request latency-optimized inference when the
+      model supports it (e.g. Claude 3.5 Haiku)
 
     AWS credentials should be provided via the standard AWS SDK methods
     (env vars, shared credentials file, instance profile, etc.).
@@ -46,34 +130,104 @@ class BedrockChat:
         if temperature is not None:
             self.config.model.temperature = temperature
 
-        # Create the Bedrock Runtime client with optional explicit creds
-        client_kwargs = {
-            "region_name": self.config.aws.region,
-        }
+        # Optional explicit creds, shared by the sync and async clients
+        self._session_kwargs: Dict[str, str] = {}
         if self.config.aws.access_key_id and self.config.aws.secret_access_key:
-            client_kwargs.update(
+            self._session_kwargs.update(
                 aws_access_key_id=self.config.aws.access_key_id,
                 aws_secret_access_key=self.config.aws.secret_access_key,
             )
             if self.config.aws.session_token:
-                client_kwargs.update(aws_session_token=self.config.aws.session_token)
+                self._session_kwargs.update(aws_session_token=self.config.aws.session_token)
+
+        # Create the Bedrock Runtime client
+        self._client = boto3.client(
+            "bedrock-runtime",
+            region_name=self.config.aws.region,
+            config=Config(**_CLIENT_CONFIG),
+            **self._session_kwargs,
+        )
+
+        # Invariant part of every request body; copied and completed per call.
+        # Built after the overrides above, so mutating config later is not reflected.
+        self._payload_template: Dict[str, object] = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": self.config.model.max_tokens,
+            "temperature": self.config.model.temperature,
+        }
+
+        # Async client for the FastAPI handlers, opened on first use
+        self._aclient = None
+        self._aclient_lock = asyncio.Lock()
+        self._aexit_stack = AsyncExitStack()
 
-        self._client = boto3.client("bedrock-runtime", **client_kwargs)
+    def _target_in(self, models) -> bool:
+        """Whether the invoked model (or inference profile) matches one of `models`."""
+        target = self.config.model.inference_profile_arn or self.config.model.model_id
+        return any(m in target for m in models)
+
+    def _invoke_kwargs(self) -> Dict[str, str]:
+        """Extra invoke_model kwargs derived from config (e.g. latency mode)."""
+        kwargs: Dict[str, str] = {}
+        if self.config.model.latency_optimized and self._target_in(_LATENCY_OPTIMIZED_MODELS):
+            kwargs["performanceConfigLatency"] = "optimized"
+        return kwargs
 
     def _to_anthropic_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, object]]:
         """
         Convert simple [{role, content}] messages to Anthropic messages format:
         {"role": "user"|"assistant", "content": [{"type": "text", "text": "..."}]}
         """
-        out: List[Dict[str, object]] = []
-        for m in messages:
-            role = m.get("role")
-            content = m.get("content") or m.get("text") or ""
-            out.append({
-                "role": role,
-                "content": [{"type": "text", "text": content}],
-            })
-        return out
+        return [
+            {
+                "role": m.get("role"),
+                "content": [{"type": "text", "text": m.get("content") or m.get("text") or ""}],
+            }
+            for m in messages
+        ]
+
+    def _build_payload(
+        self,
+        prepared: List[Dict[str, object]],
+        system_prompt: Optional[str] = None,
+    ) -> Dict[str, object]:
+        """
+        Build the Anthropic request body shared by the sync and async paths.
+        `prepared` is already in Anthropic messages format.
+        """
+        payload = self._payload_template.copy()
+        payload["messages"] = prepared
+        if system_prompt:
+            if self._target_in(_PROMPT_CACHING_MODELS):
+                # Let Bedrock reuse the encoded system prompt across calls
+                payload["system"] = _cached_system_blocks(system_prompt)
+            else:
+                payload["system"] = _augment_system_prompt(system_prompt)
+        return payload
+
+    def _invoke_params(self, payload: Dict[str, object]) -> Dict[str, object]:
+        """Keyword arguments for invoke_model (identical for boto3 and aioboto3)."""
+        return {
+            "modelId": (
+                self.config.model.inference_profile_arn
+                or self.config.model.model_id
+            ),
+            "body": orjson.dumps(payload),
+            "contentType": "application/json",
+            "accept": "application/json",
+            **self._invoke_kwargs(),
+        }
+
+    @staticmethod
+    def _extract_text(data: Dict[str, object]) -> str:
+        # Anthropic responses: {"content": [{"type": "text", "text": "..."}], ...}
+        content = data.get("content") or []
+        if content and isinstance(content, list):
+            first = content[0]
+            if isinstance(first, dict):
+                return first.get("text", "")
+        # Fallbacks
+        return data.get("output_text") or data.get("completion", "")
 
     def chat(
         self,
@@ -86,55 +240,158 @@ class BedrockChat:
         messages: list like [{"role": "user"|"assistant", "content": "..."}, ...]
         system_prompt: optional system instruction string
         """
-        payload: Dict[str, object] = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": self.config.model.max_tokens,
-            "temperature": self.config.model.temperature,
-            "messages": self._to_anthropic_messages(messages),
-        }
-        if system_prompt:
-            sp = system_prompt or ""
-            extras = [
-                "utiliser des emojis pertinents par section",
-                "séparer chaque section par une ligne horizontale '---' pour améliorer la lisibilité",
-                # Ultra‑short mode: cap length and structure
-                "mode synthèse stricte: 4–6 sections maximum, uniquement celles pertinentes au cas; pas besoin de toutes les sections du schéma",
-                "chaque section: 2–3 puces courtes (≤ 10 mots par puce)",
-                "longueur totale ≤ 200–250 mots (sauf si l'utilisateur demande explicitement des détails)",
-                "ne pas inclure de sous‑sections longues, ni tableaux, ni procédures détaillées; garder seulement critères, options, et recommandation",
-            ]
-            low = sp.lower()
-            for extra in extras:
-                if extra.lower() not in low:
-                    sp = f"{sp.rstrip()}\n{extra}"
-                    low += "\n" + extra.lower()
-            payload["system"] = sp
+        return self.chat_raw(self._to_anthropic_messages(messages), system_prompt)
 
+    def chat_raw(
+        self,
+        prepared: List[Dict[str, object]],
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """Like chat(), but `prepared` is already in Anthropic messages format."""
+        payload = self._build_payload(prepared, system_prompt)
         try:
-            response = self._client.invoke_model(
-                modelId=(
-                    self.config.model.inference_profile_arn
-                    or self.config.model.model_id
-                ),
-                body=json.dumps(payload),
-                contentType="application/json",
-                accept="application/json",
-            )
+            response = self._client.invoke_model(**self._invoke_params(payload))
             body = response.get("body")
-            data = json.loads(body.read() if hasattr(body, "read") else body)
-            # Anthropic responses: {"content": [{"type": "text", "text": "..."}], ...}
-            content = data.get("content") or []
-            if content and isinstance(content, list):
-                first = content[0]
-                if isinstance(first, dict):
-                    return first.get("text", "")
-            # Fallbacks
-            return data.get("output_text") or data.get("completion", "")
+            data = orjson.loads(body.read() if hasattr(body, "read") else body)
+            return self._extract_text(data)
         except (BotoCoreError, ClientError) as e:
             # For production, prefer logging instead of returning error details
             return f"Error contacting Bedrock: {e}"
 
     def ask(self, prompt: str, system_prompt: Optional[str] = None) -> str:
         """Convenience for single-turn chat."""
-        msgs = [{"role": "user", "content": prompt}]
-        return self.chat(msgs, system_prompt=system_prompt or self.config.model.system_prompt)
+        return self.chat_raw(
+            _single_user_message(prompt),
+            system_prompt=system_prompt or self.config.model.system_prompt,
+        )
+
+    @staticmethod
+    def _delta_text(event: Dict[str, object]) -> str:
+        """Text delta carried by an invoke_model_with_response_stream event, if any."""
+        chunk = event.get("chunk")
+        if not chunk:
+            return ""
+        data = orjson.loads(chunk["bytes"])
+        if data.get("type") == "content_block_delta":
+            delta = data.get("delta") or {}
+            if delta.get("type") == "text_delta":
+                return delta.get("text", "")
+        return ""
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+    ) -> Iterator[str]:
+        """Like chat(), but yields the reply text incrementally as Bedrock generates it."""
+        payload = self._build_payload(self._to_anthropic_messages(messages), system_prompt)
+        try:
+            response = self._client.invoke_model_with_response_stream(**self._invoke_params(payload))
+            for event in response["body"]:
+                text = self._delta_text(event)
+                if text:
+                    yield text
+        except (BotoCoreError, ClientError) as e:
+            yield f"Error contacting Bedrock: {e}"
+
+    # --------------------------
+    # Async (aioboto3) variants
+    # --------------------------
+
+    async def _get_async_client(self):
+        """Lazily open the aioboto3 client; it stays open until aclose()."""
+        if self._aclient is None:
+            async with self._aclient_lock:
+                if self._aclient is None:
+                    session = aioboto3.Session(**self._session_kwargs)
+                    self._aclient = await self._aexit_stack.enter_async_context(
+                        session.client(
+                            "bedrock-runtime",
+                            region_name=self.config.aws.region,
+                            config=AioConfig(
+                                connector_args={"keepalive_timeout": _ASYNC_KEEPALIVE_TIMEOUT},
+                                **_CLIENT_CONFIG,
+                            ),
+                        )
+                    )
+        return self._aclient
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """
+        Async version of chat(): does not block the event loop while Bedrock
+        generates. Unlike chat(), failures raise BedrockError instead of being
+        returned as reply text, so callers can tell them apart from replies.
+        """
+        return await self.achat_raw(self._to_anthropic_messages(messages), system_prompt)
+
+    async def achat_raw(
+        self,
+        prepared: List[Dict[str, object]],
+        system_prompt: Optional[str] = None,
+    ) -> str:
+        """Async version of chat_raw(); raises BedrockError on failure."""
+        payload = self._build_payload(prepared, system_prompt)
+        try:
+            client = await self._get_async_client()
+            response = await client.invoke_model(**self._invoke_params(payload))
+            body = response.get("body")
+            data = orjson.loads(await body.read() if hasattr(body, "read") else body)
+            return self._extract_text(data)
+        except (BotoCoreError, ClientError) as e:
+            raise BedrockError(f"Error contacting Bedrock: {e}") from e
+
+    async def aask(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+        """Async convenience for single-turn chat."""
+        return await self.achat_raw(
+            _single_user_message(prompt),
+            system_prompt=system_prompt or self.config.model.system_prompt,
+        )
+
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        system_prompt: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Async version of stream(). Failures, including ones after some text
+        has been yielded, raise BedrockError instead of being yielded as text.
+        """
+        payload = self._build_payload(self._to_anthropic_messages(messages), system_prompt)
+        try:
+            client = await self._get_async_client()
+            response = await client.invoke_model_with_response_stream(**self._invoke_params(payload))
+        except (BotoCoreError, ClientError) as e:
+            raise BedrockError(f"Error contacting Bedrock: {e}") from e
+        body = response["body"]
+        try:
+            async for event in body:
+                text = self._delta_text(event)
+                if text:
+                    yield text
+        except (BotoCoreError, ClientError) as e:
+            raise BedrockError(f"Error contacting Bedrock: {e}") from e
+        finally:
+            # Release the pooled connection even if the consumer stops early
+            closed = body.close()
+            if inspect.isawaitable(closed):
+                await closed
+
+    async def awarm(self) -> None:
+        """
+        Open the async client and make a cheap, non-inference bedrock-runtime
+        call so the TLS connection is already pooled when the first real
+        request arrives. Only helps requests made before the pooled
+        connection goes idle (see _ASYNC_KEEPALIVE_TIMEOUT). Requires the
+        bedrock:ListAsyncInvokes permission.
+        """
+        client = await self._get_async_client()
+        await client.list_async_invokes(maxResults=1)
+
+    async def aclose(self) -> None:
+        """Close the async client, if it was opened."""
+        await self._aexit_stack.aclose()
+        self._aclient = None
@@ -0,0 +1,178 @@
+"""
+In-process reply cache for the chat endpoint.
+
+Two layers:
+- Exact: keyed on (system prompt, full message history), LRU with a TTL.
+- Semantic (optional): for single-turn questions, compares a sentence
+  embedding of the user message against cached ones and returns the reply
+  of the closest match above a cosine-similarity threshold. Requires the
+  `sentence-transformers` package; disabled if it is not installed.
+  Questions containing digits (age, weight, doses, lab values) are never
+  matched semantically: a near-identical question with other numbers is a
+  different patient, and the cached reply would carry the first one's data.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+_logger = logging.getLogger("medai.cache")
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_has_digit = re.compile(r"\d").search
+
+
+class ReplyCache:
+    """
+    LRU + TTL cache of assistant replies.
+
+    ttl_seconds: entries older than this are ignored (<= 0 disables the cache)
+    max_entries: LRU capacity
+    similarity: cosine threshold for semantic hits (None disables them)
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = 256,
+        similarity: Optional[float] = None,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    ) -> None:
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._embedding_model = embedding_model
+        self._entries: "OrderedDict[_Key, Tuple[float, str]]" = OrderedDict()
+        # Semantic index: key -> normalized embedding (same keys as _entries)
+        self._vectors: Dict[_Key, object] = {}
+        self._encoder = None
+        self._lock = threading.Lock()
+        # Separate from _lock so a slow model load never blocks exact lookups
+        self._encoder_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @property
+    def semantic(self) -> bool:
+        return self.enabled and self.similarity is not None and self._get_encoder() is not None
+
+    def uses_semantic(self, messages: List[Dict[str, str]]) -> bool:
+        """
+        Whether semantic matching applies to this conversation: enabled,
+        single-turn, and free of numbers. Cheap; does not load the model.
+        """
+        return (
+            self.enabled
+            and self.similarity is not None
+            and len(messages) == 1
+            and not _has_digit(messages[0].get("content") or "")
+        )
+
+    @staticmethod
+    def _key(system_prompt: str, messages: List[Dict[str, str]]) -> _Key:
+        return system_prompt, tuple((m.get("role") or "", m.get("content") or "") for m in messages)
+
+    def _get_encoder(self):
+        if self._encoder is None and self.similarity is not None:
+            # Load once, even if several worker threads ask at the same time
+            with self._encoder_lock:
+                if self._encoder is None and self.similarity is not None:
+                    self._encoder = self._load_encoder()
+        return self._encoder
+
+    def _load_encoder(self):
+        """Load the embedding model; on any failure, disable semantic matching."""
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            _logger.warning("sentence-transformers not installed; semantic reply cache disabled")
+            self.similarity = None
+            return None
+        try:
+            return SentenceTransformer(self._embedding_model)
+        except Exception:
+            _logger.exception(
+                "Could not load embedding model %r; semantic reply cache disabled",
+                self._embedding_model,
+            )
+            self.similarity = None
+            return None
+
+    def _embed(self, text: str):
+        return self._get_encoder().encode(text, normalize_embeddings=True)
+
+    def _fresh(self, stored_at: float) -> bool:
+        return time.monotonic() - stored_at < self.ttl
+
+    def get(self, system_prompt: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Exact lookup on the full conversation."""
+        if not self.enabled:
+            return None
+        key = self._key(system_prompt, messages)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self._fresh(entry[0]):
+                self._evict(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_similar(self, system_prompt: str, question: str) -> Optional[str]:
+        """
+        Semantic lookup for a single-turn question. Computes an embedding, so
+        callers on the event loop should run it in a thread.
+        """
+        if _has_digit(question) or not self.semantic:
+            return None
+        vec = self._embed(question)
+        best_key: Optional[_Key] = None
+        best_score = self.similarity
+        with self._lock:
+            for key, other in self._vectors.items():
+                if key[0] != system_prompt:
+                    continue
+                score = float(vec @ other)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            stored_at, reply = self._entries[best_key]
+            if not self._fresh(stored_at):
+                self._evict(best_key)
+                return None
+            self._entries.move_to_end(best_key)
+            return reply
+
+    def put(self, system_prompt: str, messages: List[Dict[str, str]], reply: str) -> None:
+        """
+        Store a reply. Single-turn questions are also embedded when semantic
+        matching is on, so callers on the event loop should run it in a thread.
+        """
+        if not self.enabled:
+            return
+        key = self._key(system_prompt, messages)
+        vec = None
+        if self.uses_semantic(messages) and self.semantic:
+            vec = self._embed(messages[0].get("content") or "")
+        with self._lock:
+            self._entries[key] = (time.monotonic(), reply)
+            self._entries.move_to_end(key)
+            if vec is not None:
+                self._vectors[key] = vec
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: _Key) -> None:
+        self._entries.pop(key, None)
+        self._vectors.pop(key, None)
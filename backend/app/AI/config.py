@@ -63,6 +63,8 @@ class ModelConfig:
     system_prompt: str = DEFAULT_SYSTEM_PROMPT_FR
     # If set, calls will be made via this Bedrock Inference Profile instead of model_id
     inference_profile_arn: Optional[str] = None
+    # Request Bedrock latency-optimized inference (only honored for supported models)
+    latency_optimized: bool = False
 
 
 @dataclass
@@ -94,6 +96,7 @@ def load_config(path: Optional[str] = None) -> AppConfig:
       - AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, AWS_SESSION_TOKEN
       - BEDROCK_MODEL_ID, MEDAI_SYSTEM_PROMPT
       - MEDAI_MAX_TOKENS, MEDAI_TEMPERATURE
+      - BEDROCK_LATENCY_OPTIMIZED (1/true to request latency-optimized inference)
       - MEDAI_CONFIG_PATH (if `path` not provided)
     """
     cfg_path = path or _get_env("MEDAI_CONFIG_PATH")
@@ -135,6 +138,18 @@ def load_config(path: Optional[str] = None) -> AppConfig:
         except ValueError:
             return default
 
+    def _to_bool(val: Any) -> bool:
+        # Accept real JSON booleans as well as strings like "false"/"1"
+        if isinstance(val, bool):
+            return val
+        return str(val).strip().lower() in ("1", "true", "yes", "on")
+
+    def _bool_env(name: str, default: bool) -> bool:
+        val = os.getenv(name)
+        if val is None:
+            return default
+        return _to_bool(val)
+
     model = ModelConfig(
         model_id=_get_env("BEDROCK_MODEL_ID", model_data.get("model_id", DEFAULT_MODEL_ID)) or DEFAULT_MODEL_ID,
         max_tokens=_int_env("MEDAI_MAX_TOKENS", int(model_data.get("max_tokens", DEFAULT_MAX_TOKENS))),
@@ -142,6 +157,7 @@ def load_config(path: Optional[str] = None) -> AppConfig:
         system_prompt=_get_env("MEDAI_SYSTEM_PROMPT", model_data.get("system_prompt"))
         or ModelConfig.system_prompt,
         inference_profile_arn=_get_env("BEDROCK_INFERENCE_PROFILE_ARN", model_data.get("inference_profile_arn")),
+        latency_optimized=_bool_env("BEDROCK_LATENCY_OPTIMIZED", _to_bool(model_data.get("latency_optimized", False))),
     )
 
     return AppConfig(aws=aws, model=model)
@@ -0,0 +1,10 @@
+"""
+Exceptions shared by the AI package.
+
+Kept free of boto3/aioboto3 imports so callers can catch them without
+loading the AWS SDK.
+"""
+
+
+class BedrockError(Exception):
+    """Bedrock could not be reached or rejected the request (async API)."""
@@ -1,18 +1,24 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import TYPE_CHECKING, List, Optional, Literal, Tuple
 import os
 import asyncio
 import logging
+import threading
 
-# Amazon Transcribe Streaming SDK
-from amazon_transcribe.client import TranscribeStreamingClient
-from amazon_transcribe.model import TranscriptEvent
+import orjson
 
-from app.AI.bedrock_client import BedrockChat
+# boto3/botocore and the Transcribe SDK are slow to import; they are loaded on
+# first use (see _get_bedrock and ws_transcribe) to keep startup fast.
+from app.AI.cache import ReplyCache
+from app.AI.errors import BedrockError
 from app.AI.config import load_config
 
+if TYPE_CHECKING:
+    from app.AI.bedrock_client import BedrockChat
+
 
 class Message(BaseModel):
     role: Literal["user", "assistant"]
@@ -32,27 +38,49 @@ class ChatResponse(BaseModel):
     reply: str
 
 
-app = FastAPI(title="MedAI Backend", version="0.1.0")
+# orjson-backed responses: faster serialization than stdlib json for every endpoint
+app = FastAPI(
+    title="MedAI Backend",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    val = os.getenv(name)
+    if not val:
+        return default
+    try:
+        return float(val)
+    except ValueError:
+        return default
+
+
+_DEFAULT_CORS_ORIGINS = (
+    "http://localhost:443",
+    "http://127.0.0.1:443",
+)
 
 
-def _parse_cors_origins() -> List[str]:
+def _parse_cors_origins() -> Tuple[str, ...]:
     raw = os.getenv("MEDAI_CORS_ORIGINS", "").strip()
     if raw == "*":
-        return ["*"]
-    if raw:
-        parts = [p.strip() for p in raw.split(",") if p.strip()]
-        if parts:
-            return parts
-    return [
-        "http://localhost:443",
-        "http://127.0.0.1:443",
-    ]
+        return ("*",)
+    parts = tuple(p for p in (p.strip() for p in raw.split(",")) if p)
+    return parts or _DEFAULT_CORS_ORIGINS
 
 
 _CORS_ORIGINS = _parse_cors_origins()
 _ALLOW_CREDENTIALS_ENV = os.getenv("MEDAI_CORS_ALLOW_CREDENTIALS", "true").lower() == "true"
 # Browsers disallow credentials with wildcard origin. Avoid sending creds with "*".
-_ALLOW_CREDENTIALS = _ALLOW_CREDENTIALS_ENV and _CORS_ORIGINS != ["*"]
+_ALLOW_CREDENTIALS = _ALLOW_CREDENTIALS_ENV and _CORS_ORIGINS != ("*",)
 
 app.add_middleware(
     CORSMiddleware,
@@ -74,35 +102,173 @@ even if AWS credentials/region aren't configured yet. We lazily
 initialize on first use.
 """
 _CONFIG = load_config()
-_bedrock_client: Optional[BedrockChat] = None
+_bedrock_client: Optional["BedrockChat"] = None
+
+# Reply cache, opt-in: replies are sampled (temperature > 0) and shared by all
+# users, so caching is off unless MEDAI_CACHE_TTL (seconds) is set. Set
+# MEDAI_CACHE_SIM (e.g. 0.95) to also match near-identical questions.
+_REPLY_CACHE = ReplyCache(
+    ttl_seconds=_env_int("MEDAI_CACHE_TTL", 0),
+    max_entries=_env_int("MEDAI_CACHE_SIZE", 256),
+    similarity=_env_float("MEDAI_CACHE_SIM", None),
+)
+
 
+# Guards client creation: the startup warm-up builds it from a worker thread
+_bedrock_lock = threading.Lock()
 
-def _get_bedrock() -> BedrockChat:
+
+def _get_bedrock() -> "BedrockChat":
     global _bedrock_client
     if _bedrock_client is None:
-        _bedrock_client = BedrockChat(config=_CONFIG)
+        with _bedrock_lock:
+            if _bedrock_client is None:
+                from app.AI.bedrock_client import BedrockChat
+
+                _bedrock_client = BedrockChat(config=_CONFIG)
     return _bedrock_client
 
 
+async def _aget_bedrock() -> "BedrockChat":
+    # For async handlers: the first call imports boto3 and builds the client,
+    # and may wait on _bedrock_lock held by the warm-up thread, so never run
+    # it on the event loop.
+    return _bedrock_client or await asyncio.to_thread(_get_bedrock)
+
+
 # Removed server-side shortening: keep model output intact
 
 
-@app.post("/api/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def _warm_bedrock() -> None:
+    # Pre-open the Bedrock connection so the first chat skips the TLS handshake.
+    # Failures (e.g. missing credentials) must not prevent the app from starting.
+    try:
+        # Importing boto3 and building the client is blocking; do it off the loop
+        br = await asyncio.to_thread(_get_bedrock)
+        await br.awarm()
+    except Exception as e:
+        logging.getLogger("medai.bedrock").warning("Bedrock warm-up skipped: %s", e)
+
+
+_warmup_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def _start_bedrock_warmup() -> None:
+    # Run in the background so the app (and /health) is ready immediately
+    global _warmup_task
+    if os.getenv("MEDAI_BEDROCK_WARMUP", "false").lower() == "true":
+        _warmup_task = asyncio.create_task(_warm_bedrock())
+
+
+@app.on_event("shutdown")
+async def _close_bedrock() -> None:
+    if _warmup_task is not None and not _warmup_task.done():
+        _warmup_task.cancel()
+        try:
+            await _warmup_task
+        except asyncio.CancelledError:
+            pass
+    if _bedrock_client is not None:
+        await _bedrock_client.aclose()
+
+
+def _history(req: ChatRequest) -> List[dict]:
     # Prefer multi-turn history if provided; otherwise fall back to single-turn
+    if req.messages:
+        # Convert Pydantic models to plain dicts
+        return [{"role": m.role, "content": m.content} for m in req.messages]
+    return [{"role": "user", "content": req.message or ""}]
+
+
+async def _cached_reply(sp: str, history: List[dict]) -> Optional[str]:
+    if not _REPLY_CACHE.enabled:
+        return None
+    reply = _REPLY_CACHE.get(sp, history)
+    if reply is None and _REPLY_CACHE.uses_semantic(history):
+        reply = await asyncio.to_thread(_REPLY_CACHE.get_similar, sp, history[0]["content"])
+    return reply
+
+
+async def _store_reply(sp: str, history: List[dict], reply: str) -> None:
+    # Only called for successful replies (Bedrock failures raise BedrockError)
+    if not reply or not _REPLY_CACHE.enabled:
+        return
+    if _REPLY_CACHE.uses_semantic(history):
+        # Embedding the question is CPU-bound; keep it off the event loop
+        await asyncio.to_thread(_REPLY_CACHE.put, sp, history, reply)
+    else:
+        _REPLY_CACHE.put(sp, history, reply)
+
+
+# No response_model: the reply is a server-produced string, so skip output
+# validation and return the ORJSONResponse as-is. The schema stays documented.
+@app.post("/api/chat", responses={200: {"model": ChatResponse}})
+async def chat(req: ChatRequest):
+    sp = _CONFIG.model.system_prompt
+    history = _history(req)
+
+    reply = await _cached_reply(sp, history)
+    if reply is not None:
+        return ORJSONResponse(content={"reply": reply})
+
     try:
-        br = _get_bedrock()
+        br = await _aget_bedrock()
         if req.messages:
-            # Convert Pydantic models to plain dicts
-            history = [{"role": m.role, "content": m.content} for m in req.messages]
-            reply = br.chat(history, system_prompt=_CONFIG.model.system_prompt)
+            reply = await br.achat(history, system_prompt=sp)
         else:
-            msg = req.message or ""
-            reply = br.ask(msg, system_prompt=_CONFIG.model.system_prompt)
+            reply = await br.aask(history[0]["content"], system_prompt=sp)
+    except BedrockError as e:
+        reply = str(e)
     except Exception as e:
         reply = f"Server configuration error: {e}"
+    else:
+        await _store_reply(sp, history, reply)
     # Return model reply without post-processing
-    return {"reply": reply}
+    return ORJSONResponse(content={"reply": reply})
+
+
+def _sse(data: dict) -> bytes:
+    return b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Same input as /api/chat, but the reply is streamed as Server-Sent Events:
+        data: {"delta": "..."}   (repeated as tokens arrive)
+        data: {"error": "..."}   (only on failure; earlier deltas are incomplete)
+        data: {"done": true}
+    """
+    sp = _CONFIG.model.system_prompt
+    history = _history(req)
+
+    async def events():
+        reply = await _cached_reply(sp, history)
+        if reply is not None:
+            yield _sse({"delta": reply})
+            yield _sse({"done": True})
+            return
+        parts: List[str] = []
+        try:
+            br = await _aget_bedrock()
+            async for delta in br.astream(history, system_prompt=sp):
+                parts.append(delta)
+                yield _sse({"delta": delta})
+        except BedrockError as e:
+            # Partial replies are never cached
+            yield _sse({"error": str(e)})
+        except Exception as e:
+            yield _sse({"error": f"Server configuration error: {e}"})
+        else:
+            await _store_reply(sp, history, "".join(parts))
+        yield _sse({"done": True})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/debug/system_prompt")
@@ -121,24 +287,66 @@ def debug_system_prompt():
 # Amazon Transcribe Streaming
 # --------------------------
 
+# Accepted spellings of supported languages -> Transcribe language codes
+_LANG_MAP = {
+    "fr": "fr-FR",  # French
+    "fr-fr": "fr-FR",
+    "fr_fr": "fr-FR",
+    "en": "en-US",  # English (US)
+    "en-us": "en-US",
+    "en_us": "en-US",
+}
+
+
 def _normalize_lang(lang: Optional[str]) -> str:
-    # Allow simple values like 'fr'/'en' and expand to supported codes
+    # Allow simple values like 'fr'/'en' and expand to supported codes;
+    # fall back to fr-FR if missing or unsupported
     if not lang:
         return "fr-FR"
-    l = lang.strip()
-    if l.lower() in ("fr", "fr-fr", "fr_fr"):  # French
-        return "fr-FR"
-    if l.lower() in ("en", "en-us", "en_us"):  # English (US)
-        return "en-US"
-    # Fallback to fr-FR if unsupported
-    return "fr-FR"
+    return _LANG_MAP.get(lang.strip().lower(), "fr-FR")
+
+
+# Transcript events are coalesced for this long (seconds) before being sent;
+# a full batch is flushed immediately.
+_TRANSCRIPT_FLUSH_INTERVAL = 0.03
+_TRANSCRIPT_MAX_BATCH = 64
+
+# Pre-serialized error frames sent to the client
+_ERR_TRANSCRIBE_START = orjson.dumps({"type": "error", "message": "transcribe_start_error"})
+_ERR_TRANSCRIBE = orjson.dumps({"type": "error", "message": "transcribe_error"})
+
+
+# Incoming audio frames are coalesced up to this many bytes (default: 200ms of
+# 16kHz 16-bit PCM, the top of Transcribe's recommended chunk range) or until
+# the oldest buffered frame is this many milliseconds old.
+_AUDIO_BATCH_BYTES = _env_int("MEDAI_AUDIO_BATCH_BYTES", 6400)
+_AUDIO_BATCH_SECONDS = _env_int("MEDAI_AUDIO_BATCH_MS", 100) / 1000
+
+
+_transcribe_sdk: Optional[tuple] = None
+
+
+def _load_transcribe() -> tuple:
+    # Importing amazon_transcribe loads awscrt, which is slow; ws_transcribe
+    # runs this in a worker thread so the first session does not block the loop.
+    global _transcribe_sdk
+    from amazon_transcribe.client import TranscribeStreamingClient
+    from amazon_transcribe.model import TranscriptEvent
+
+    _transcribe_sdk = (TranscribeStreamingClient, TranscriptEvent)
+    return _transcribe_sdk
+
+
+# Allow toggling verbosity via env var (set once, not per connection)
+logging.getLogger("medai.transcribe").setLevel(
+    logging.DEBUG if os.getenv("MEDAI_TRANSCRIBE_DEBUG", "false").lower() == "true" else logging.INFO
+)
 
 
 @app.websocket("/ws/transcribe")
 async def ws_transcribe(websocket: WebSocket):
 
     logger = logging.getLogger("medai.transcribe")
-    logger.setLevel(logging.DEBUG)
     logger.info("Websocket started running.")
     """WebSocket proxy to Amazon Transcribe Streaming.
 
@@ -149,17 +357,13 @@ async def ws_transcribe(websocket: WebSocket):
 
     Server behavior:
     - Forwards binary audio to Transcribe input stream.
-    - Streams back partial and final transcripts as JSON text frames:
-        {"type":"partial","text":"..."}
-        {"type":"final","text":"..."}
+    - Streams back partial and final transcripts, batched every ~30ms, as
+      binary frames holding a UTF-8 JSON array:
+        [{"type":"partial","text":"..."}, {"type":"final","text":"..."}]
     """
     
-    # Allow toggling verbosity via env var
-   
-    
-
-
     await websocket.accept()
+    stream = None
     try:
         params = websocket.query_params
         lang = _normalize_lang(params.get("lang"))
@@ -172,6 +376,8 @@ async def ws_transcribe(websocket: WebSocket):
             encoding = "pcm"
 
         # Initialize Transcribe Streaming client lazily
+        TranscribeStreamingClient, TranscriptEvent = _transcribe_sdk or await asyncio.to_thread(_load_transcribe)
+
         region = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
         client = TranscribeStreamingClient(region=region)
 
@@ -188,81 +394,171 @@ async def ws_transcribe(websocket: WebSocket):
         )
         logger.info("Transcribe stream started")
 
-        stats = {
-            "bytes_in": 0,
-            "frames_in": 0,
-            "partials_out": 0,
-            "finals_out": 0,
-        }
-
         async def forward_audio():
+            receive = websocket.receive
+            send_audio = stream.input_stream.send_audio_event
+            loop = asyncio.get_running_loop()
+            # Small client frames are coalesced into fewer, larger audio events
+            buf = bytearray()
+            deadline = 0.0
+            frames_in = 0
+            bytes_in = 0
+
+            async def flush_audio():
+                if buf:
+                    chunk = bytes(buf)
+                    buf.clear()
+                    await send_audio(audio_chunk=chunk)
+
             try:
                 while True:
-                    msg = await websocket.receive()
-                    if msg.get("type") == "websocket.disconnect":
+                    if buf:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            await flush_audio()
+                            continue
+                        try:
+                            msg = await asyncio.wait_for(receive(), timeout=timeout)
+                        except asyncio.TimeoutError:
+                            await flush_audio()
+                            continue
+                    else:
+                        msg = await receive()
+                    chunk = msg.get("bytes")
+                    if chunk is not None:
+                        frames_in += 1
+                        bytes_in += len(chunk)
+                        if frames_in % 50 == 0:
+                            logger.debug("Received %s frames (%s bytes) for Transcribe", frames_in, bytes_in)
+                        if not buf:
+                            deadline = loop.time() + _AUDIO_BATCH_SECONDS
+                        buf += chunk
+                        if len(buf) >= _AUDIO_BATCH_BYTES:
+                            await flush_audio()
+                        continue
+                    if msg["type"] == "websocket.disconnect":
                         logger.info("WebSocket disconnect signal received during audio forward")
                         break
-                    if "bytes" in msg and msg["bytes"] is not None:
-                        chunk = msg["bytes"]
-                        size = len(chunk)
-                        stats["bytes_in"] += size
-                        stats["frames_in"] += 1
-                        if stats["frames_in"] % 50 == 0:
-                            logger.debug(
-                                "Forwarded %s frames (%s bytes) to Transcribe",
-                                stats["frames_in"],
-                                stats["bytes_in"],
-                            )
-                        await stream.input_stream.send_audio_event(audio_chunk=chunk)
-                    elif "text" in msg and msg["text"] is not None:
+                    text = msg.get("text")
+                    if text is not None:
                         # If client signals end, stop upstream
-                        signal = msg["text"].strip()
+                        signal = text.strip()
                         logger.debug("Received text control frame: %r", signal)
                         if signal.upper() == "END":
                             logger.info("END signal received from client; closing input stream")
                             break
             finally:
-                # End the input audio stream to flush any buffered results
+                # Send any buffered audio, then end the input audio stream to
+                # flush any buffered results. Still needed with the TaskGroup:
+                # on END this task returns normally and relay_transcripts waits
+                # for Transcribe to finish.
                 try:
+                    await flush_audio()
                     await stream.input_stream.end_stream()
                 except Exception:
                     pass
-                logger.info(
-                    "Audio input stream closed | frames=%s bytes=%s",
-                    stats["frames_in"],
-                    stats["bytes_in"],
-                )
+                logger.info("Audio input stream closed | frames=%s bytes=%s", frames_in, bytes_in)
+
+        # Transcript events are buffered and sent as one JSON array per frame.
+        # Events are pre-encoded: only "text" varies, so each one is a fixed
+        # prefix + orjson-escaped text instead of a dict serialized per event.
+        lang_b = orjson.dumps(lang)
+        partial_prefix = b'{"type":"partial","language":' + lang_b + b',"text":'
+        final_prefix = b'{"type":"final","language":' + lang_b + b',"text":'
+        pending: List[bytes] = []
+        # Set when the buffer goes from empty to non-empty, or when relay ends
+        wake = asyncio.Event()
+        relay_done = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # Resolved when the coalescing window ends (timer) or the batch is full
+        window: List[asyncio.Future] = []
+
+        async def flush_pending():
+            if pending:
+                frame = b"[" + b",".join(pending) + b"]"
+                pending.clear()
+                await websocket.send_bytes(frame)
+
+        def end_window():
+            if window and not window[0].done():
+                window[0].set_result(None)
+
+        async def flush_transcripts():
+            # Idle sessions cost nothing: sleep until the first event arrives,
+            # then hold the batch open for one interval (or until it is full).
+            while True:
+                await wake.wait()
+                if not relay_done.is_set() and len(pending) < _TRANSCRIPT_MAX_BATCH:
+                    window[:] = [loop.create_future()]
+                    timer = loop.call_later(_TRANSCRIPT_FLUSH_INTERVAL, end_window)
+                    try:
+                        await window[0]
+                    finally:
+                        timer.cancel()
+                        window.clear()
+                wake.clear()
+                await flush_pending()
+                if relay_done.is_set():
+                    await flush_pending()
+                    return
 
         async def relay_transcripts():
-            async for event in stream.output_stream:
-                if isinstance(event, TranscriptEvent):
-                    results = event.transcript.results or []
+            # Hoist lookups out of the per-event loop
+            dumps = orjson.dumps
+            append = pending.append
+            debug = logger.isEnabledFor(logging.DEBUG)
+            partials_out = 0
+            finals_out = 0
+            try:
+                async for event in stream.output_stream:
+                    if not isinstance(event, TranscriptEvent):
+                        continue
+                    results = event.transcript.results
+                    if not results:
+                        continue
                     for res in results:
                         # res.is_partial indicates interim hypothesis
-                        is_final = not getattr(res, "is_partial", False)
-                        for alt in (res.alternatives or []):
-                            text = (alt.transcript or "").strip()
+                        is_final = not res.is_partial
+                        prefix = final_prefix if is_final else partial_prefix
+                        for alt in (res.alternatives or ()):
+                            text = alt.transcript
+                            if not text:
+                                continue
+                            text = text.strip()
                             if not text:
                                 continue
-                            snippet = (text[:120] + "…") if len(text) > 120 else text
                             if is_final:
-                                stats["finals_out"] += 1
-                                logger.debug("Final #%s: %s", stats["finals_out"], snippet)
+                                finals_out += 1
+                                if debug:
+                                    snippet = (text[:120] + "…") if len(text) > 120 else text
+                                    logger.debug("Final #%s: %s", finals_out, snippet)
                             else:
-                                stats["partials_out"] += 1
+                                partials_out += 1
                                 # Throttle partial logs
-                                if stats["partials_out"] % 10 == 0:
-                                    logger.debug("Partial #%s: %s", stats["partials_out"], snippet)
-
-                            payload = {
-                                "type": "final" if is_final else "partial",
-                                "text": text,
-                                "language": lang,
-                            }
-                            await websocket.send_json(payload)
+                                if debug and partials_out % 10 == 0:
+                                    snippet = (text[:120] + "…") if len(text) > 120 else text
+                                    logger.debug("Partial #%s: %s", partials_out, snippet)
+
+                            if not pending:
+                                wake.set()
+                            append(prefix + dumps(text) + b"}")
+                            if len(pending) >= _TRANSCRIPT_MAX_BATCH:
+                                end_window()
+            finally:
+                # Let the flusher send what is left and stop
+                relay_done.set()
+                wake.set()
+                end_window()
 
-        # Run both tasks concurrently
-        await asyncio.gather(forward_audio(), relay_transcripts())
+        # Run all tasks concurrently; a failure in one cancels the others
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(forward_audio())
+                tg.create_task(relay_transcripts())
+                tg.create_task(flush_transcripts())
+        except ExceptionGroup as eg:
+            # Surface the first failure to the handlers below
+            raise eg.exceptions[0]
 
     except WebSocketDisconnect:
         # Client disconnected; nothing else to do
@@ -271,7 +567,8 @@ async def ws_transcribe(websocket: WebSocket):
     except Exception as e:
         logging.getLogger("medai.transcribe").exception("Transcribe WS error: %s", e)
         try:
-            await websocket.send_json({"type": "error", "message": str(e)})
+            # Details stay in the server log; the client gets a fixed error code
+            await websocket.send_bytes(_ERR_TRANSCRIBE if stream is not None else _ERR_TRANSCRIBE_START)
         except Exception:
             pass
         finally:
@@ -279,3 +576,17 @@ async def ws_transcribe(websocket: WebSocket):
                 await websocket.close()
             except Exception:
                 pass
+
+
+if __name__ == "__main__":
+    # Programmatic launch (python -m app.main) with the same fast loop/parsers as the CLI
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=_env_int("PORT", 8000),
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+    )
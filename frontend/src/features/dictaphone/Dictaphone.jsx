@@ -71,14 +71,19 @@ export default function Dictaphone() {
     }
     ws.onmessage = (ev) => {
       try {
-        const data = JSON.parse(ev.data)
-        if (data.type === 'partial') {
-          setInterim(data.text || '')
-        } else if (data.type === 'final') {
-          setTranscript((prev) => (prev ? prev + ' ' : '') + (data.text || '').trim())
-          setInterim('')
-        } else if (data.type === 'error') {
-          setError(String(data.message || 'transcribe-error'))
+        // Backend sends binary frames holding a JSON array of events (or a single event)
+        const raw = typeof ev.data === 'string' ? ev.data : utf8Decoder.decode(ev.data)
+        const parsed = JSON.parse(raw)
+        const events = Array.isArray(parsed) ? parsed : [parsed]
+        for (const data of events) {
+          if (data.type === 'partial') {
+            setInterim(data.text || '')
+          } else if (data.type === 'final') {
+            setTranscript((prev) => (prev ? prev + ' ' : '') + (data.text || '').trim())
+            setInterim('')
+          } else if (data.type === 'error') {
+            setError(String(data.message || 'transcribe-error'))
+          }
         }
       } catch {}
     }
@@ -182,6 +187,7 @@ function MicIcon() {
 
 // ---------- Cloud streaming helpers ----------
 const API_BASE = import.meta.env.VITE_API_BASE || 'http://localhost:8000'
+const utf8Decoder = new TextDecoder('utf-8')
 
 async function ensureAudioContext() {
   let ctx = window._medaiAudioCtx